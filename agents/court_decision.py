@@ -4,6 +4,8 @@ import time
 from phi.agent import Agent
 from phi.model.openai import OpenAIChat
 from phi.embedder.openai import OpenAIEmbedder
+from cache import get_shared_cache
+from decisions import overfetch_count, group_by_decision, needs_more_rows, MAX_MATCH_COUNT
 
 class PutusanAgent(Agent):
     def __init__(self, **kwargs):
@@ -24,57 +26,49 @@ class PutusanAgent(Agent):
                 return []
 
             start_time = time.time()
+
+            # Serve repeated searches from the cache shared by all workers
+            shared_cache = get_shared_cache()
+            search_key = shared_cache.make_key(query, top_k)
+            cached_decisions = shared_cache.get("decision_search", search_key)
+            if cached_decisions is not None:
+                self.court_decisions = cached_decisions
+                self.format_results(self.court_decisions)
+                return self.court_decisions
             
             # Generate embedding asynchronously
-            query_embedding = await self.embedder.get_embedding_async(query)
+            embedding_key = shared_cache.make_key(query)
+            query_embedding = shared_cache.get("embedding", embedding_key)
+            if query_embedding is None:
+                query_embedding = await self.embedder.get_embedding_async(query)
+                shared_cache.set("embedding", embedding_key, query_embedding)
             embedding_time = time.time() - start_time
             
-            # First try with higher threshold
+            # Over-fetch chunks so that grouping still yields top_k distinct decisions
             search_start = time.time()
-            result = await asyncio.wait_for(
-                self.supabase.rpc(
-                    'match_documents',
-                    {
-                        'query_embedding': query_embedding,
-                        'match_count': top_k,
-                        'match_threshold': 0.6
-                    }
-                ).execute(),
-                timeout=10.0
-            )
+            match_count = overfetch_count(top_k)
+            match_threshold = 0.6
+            result = await self._match_documents(query_embedding, match_count, match_threshold)
             
             # If no results, try with lower threshold
             if not result.data:
-                result = await asyncio.wait_for(
-                    self.supabase.rpc(
-                        'match_documents',
-                        {
-                            'query_embedding': query_embedding,
-                            'match_count': top_k,
-                            'match_threshold': 0.4
-                        }
-                    ).execute(),
-                    timeout=10.0
-                )
+                match_threshold = 0.4
+                result = await self._match_documents(query_embedding, match_count, match_threshold)
+
+            # Widen the fetch only when chunks of a few decisions filled every row
+            while needs_more_rows(result.data, match_count, top_k):
+                match_count = min(match_count * 2, MAX_MATCH_COUNT)
+                result = await self._match_documents(query_embedding, match_count, match_threshold)
             
             search_time = time.time() - search_start
             
-            # Process and format results
+            # Group chunks by decision, then process and format results
+            search_terms = [term for term in query.lower().split() if len(term) > 2]
             processed_results = []
-            for doc in result.data:
-                # Find best matching segment
-                search_terms = [term for term in query.lower().split() if len(term) > 2]
-                content = doc.get('content', '').lower()
-                best_match = ''
-                best_score = 0
-                
-                window_size = 300
-                for i in range(0, len(content) - window_size, 50):
-                    window = content[i:i + window_size]
-                    score = sum(window.count(term) for term in search_terms)
-                    if score > best_score:
-                        best_score = score
-                        best_match = doc.get('content', '')[i:i + window_size]
+            for doc in group_by_decision(result.data, top_k):
+                # Merge the best matching segments of the decision's top chunks
+                segments = [self._best_segment(chunk, search_terms) for chunk in doc['chunks'][:2]]
+                best_match = '\n...\n'.join(segment for segment in segments if segment)
                 
                 # Highlight matching terms
                 if best_match:
@@ -99,16 +93,14 @@ class PutusanAgent(Agent):
                         'file_url': doc.get('file_url'),
                         'link_gdrive': doc.get('link_gdrive')
                     },
-                    'relevance_score': round(doc.get('similarity', 0) * 100),
+                    'relevance_score': round(doc['decision_score'] * 100),
+                    'chunk_count': doc['chunk_count'],
                     'matched_segment': best_match + '...' if best_match else ''
                 })
             
-            # Sort by relevance and limit results
-            self.court_decisions = sorted(
-                processed_results,
-                key=lambda x: x['relevance_score'],
-                reverse=True
-            )[:top_k]
+            # Already ranked by decision score and limited to top_k
+            self.court_decisions = processed_results
+            shared_cache.set("decision_search", search_key, self.court_decisions)
             
             format_start = time.time()
             self.format_results(self.court_decisions)
@@ -131,6 +123,33 @@ class PutusanAgent(Agent):
             print(f"Error in decision search: {e}")
             return []
 
+    async def _match_documents(self, query_embedding: List[float], match_count: int, match_threshold: float):
+        return await asyncio.wait_for(
+            self.supabase.rpc(
+                'match_documents',
+                {
+                    'query_embedding': query_embedding,
+                    'match_count': match_count,
+                    'match_threshold': match_threshold
+                }
+            ).execute(),
+            timeout=10.0
+        )
+
+    @staticmethod
+    def _best_segment(content: str, search_terms: List[str], window_size: int = 300) -> str:
+        """Find the window of the content containing the most search terms"""
+        lowered = content.lower()
+        best_match = ''
+        best_score = 0
+        for i in range(0, len(lowered) - window_size, 50):
+            window = lowered[i:i + window_size]
+            score = sum(window.count(term) for term in search_terms)
+            if score > best_score:
+                best_score = score
+                best_match = content[i:i + window_size]
+        return best_match
+
     def format_results(self, results: List[Dict]) -> None:
         template = """**Metadata Putusan Pengadilan**
 * **Nomor Putusan:** {nomor_putusan}
@@ -1,10 +1,16 @@
 import json
+from typing import Callable, Dict, Optional
 from phi.model.openai import OpenAIChat
 from phi.agent import Agent, RunResponse
 from phi.tools.googlesearch import GoogleSearch
 from phi.workflow import Workflow
 from phi.storage.workflow.sqlite import SqlWorkflowStorage
 from phi.playground import Playground, serve_playground_app
+from cache import get_shared_cache, namespace_ttl
+from archive import get_report_archive
+from near_duplicates import get_near_duplicate_index
+from jobs_api import jobs_router, job_scheduler
+from dossier import LONG_INPUT_CHARS, split_dossier, clone_agent, map_chunks, merge_sections, reduce_partials
 
 # Initialize session storage
 session_storage = SqlWorkflowStorage(
@@ -12,6 +18,16 @@ session_storage = SqlWorkflowStorage(
     db_file="tmp/workflows.db"
 )
 
+# Cross-process cache shared by all server workers
+shared_cache = get_shared_cache()
+
+# Compressed, indexed store for analysis results, kept out of the workflow session_state.
+# Lookups use the same per-namespace TTL as the shared cache, so expired results are regenerated.
+report_archive = get_report_archive()
+
+# MinHash/LSH index of analysed cases, used to reuse analyses of near-identical template cases
+near_duplicate_index = get_near_duplicate_index()
+
 # Create Research Agent for case classification
 case_classification_agent = Agent(
     name="Case Classification Agent",
@@ -89,81 +105,108 @@ def save_session_state(session_id: str, data: dict):
     """Save data to session state"""
     session_storage.upsert(session_id, data)
 
-def classify_case_elements(case_info: str, session_id: str = "default") -> str:
+def run_classification(case_info: str, long_input: Optional[bool] = None, agent: Optional[Agent] = None) -> str:
+    """Run the classification agent, mapping it over dossier chunks for long inputs"""
+    agent = agent or case_classification_agent
+    prompt = "Classify the following case elements:"
+    if long_input is None:
+        long_input = len(case_info) > LONG_INPUT_CHARS
+    if not long_input:
+        return agent.run(f"{prompt}\n{case_info}").content
+
+    # Classifications are lists, so the reduce step is a deterministic merge with dedup
+    partials = map_chunks(agent, prompt, split_dossier(case_info))
+    return merge_sections(partials)
+
+def run_criminal_analysis(case_facts: str, long_input: Optional[bool] = None, agent: Optional[Agent] = None) -> str:
+    """Run the criminal analysis agent, mapping it over dossier chunks for long inputs"""
+    agent = agent or criminal_analysis_agent
+    prompt = "Analyze the following case facts:"
+    if long_input is None:
+        long_input = len(case_facts) > LONG_INPUT_CHARS
+    if not long_input:
+        return agent.run(f"{prompt}\n{case_facts}").content
+
+    partials = map_chunks(agent, prompt, split_dossier(case_facts))
+    return reduce_partials(agent, prompt, partials)
+
+def classify_case_elements(case_info: str, session_id: str = "default", agent: Optional[Agent] = None) -> str:
     """Classify case elements using the research agent with caching"""
-    agent_team.session_id = session_id
     
     # Check cache
-    if "case_classification" in agent_team.session_state:
-        cached_result = next((r for r in agent_team.session_state["case_classification"] if r["case_info"] == case_info), None)
-        if cached_result:
-            return cached_result["classification"]
+    shared_key = shared_cache.make_key(case_info)
+    shared_result = shared_cache.get("case_classification", shared_key)
+    if shared_result is not None:
+        return shared_result
+
+    cached_result = report_archive.find("case_classification", case_info, max_age=namespace_ttl("case_classification"))
+    if cached_result:
+        shared_cache.set("case_classification", shared_key, cached_result["classification"])
+        return cached_result["classification"]
     
     # Perform classification
-    response: RunResponse = case_classification_agent.run(
-        f"Classify the following case elements:\n{case_info}"
-    )
+    classification = run_classification(case_info, agent=agent)
     
     # Cache result
-    if "case_classification" not in agent_team.session_state:
-        agent_team.session_state["case_classification"] = []
-    agent_team.session_state["case_classification"].append({
+    report_archive.put("case_classification", {
         "case_info": case_info,
-        "classification": response.content
-    })
-    agent_team.write_to_storage()
+        "classification": classification
+    }, session_id, case_info)
+    shared_cache.set("case_classification", shared_key, classification)
     
-    return response.content
+    return classification
 
-def analyze_criminal_acts(case_facts: str, session_id: str = "default") -> str:
+def analyze_criminal_acts(case_facts: str, session_id: str = "default", agent: Optional[Agent] = None) -> str:
     """Analyze criminal case facts and identify act + modus operandi with caching"""
-    agent_team.session_id = session_id
     
     # Check cache
-    if "criminal_analysis" in agent_team.session_state:
-        cached_result = next((r for r in agent_team.session_state["criminal_analysis"] if r["case_facts"] == case_facts), None)
-        if cached_result:
-            return cached_result["analysis"]
+    shared_key = shared_cache.make_key(case_facts)
+    shared_result = shared_cache.get("criminal_analysis", shared_key)
+    if shared_result is not None:
+        return shared_result
+
+    cached_result = report_archive.find("criminal_analysis", case_facts, max_age=namespace_ttl("criminal_analysis"))
+    if cached_result:
+        shared_cache.set("criminal_analysis", shared_key, cached_result["analysis"])
+        return cached_result["analysis"]
     
     # Perform analysis
-    response: RunResponse = criminal_analysis_agent.run(
-        f"Analyze the following case facts:\n{case_facts}"
-    )
+    analysis = run_criminal_analysis(case_facts, agent=agent)
     
     # Cache result
-    if "criminal_analysis" not in agent_team.session_state:
-        agent_team.session_state["criminal_analysis"] = []
-    agent_team.session_state["criminal_analysis"].append({
+    report_archive.put("criminal_analysis", {
         "case_facts": case_facts,
-        "analysis": response.content
-    })
-    agent_team.write_to_storage()
+        "analysis": analysis
+    }, session_id, case_facts)
+    shared_cache.set("criminal_analysis", shared_key, analysis)
     
-    return response.content
+    return analysis
 
-def search_legal_articles(query: str, session_id: str = "default") -> str:
+def search_legal_articles(query: str, session_id: str = "default", agent: Optional[Agent] = None) -> str:
     """Search for legal articles and laws using the web search agent with caching"""
-    agent_team.session_id = session_id
     
     # Check cache
-    if "legal_search" in agent_team.session_state:
-        cached_result = next((r for r in agent_team.session_state["legal_search"] if r["query"] == query), None)
-        if cached_result:
-            return cached_result["results"]
+    shared_key = shared_cache.make_key(query)
+    shared_result = shared_cache.get("legal_search", shared_key)
+    if shared_result is not None:
+        return shared_result
+
+    cached_result = report_archive.find("legal_search", query, max_age=namespace_ttl("legal_search"))
+    if cached_result:
+        shared_cache.set("legal_search", shared_key, cached_result["results"])
+        return cached_result["results"]
     
     # Perform search
-    response: RunResponse = web_search_agent.run(
+    response: RunResponse = (agent or web_search_agent).run(
         f"Search for legal articles and laws related to: {query}"
     )
     
     # Cache result
-    if "legal_search" not in agent_team.session_state:
-        agent_team.session_state["legal_search"] = []
-    agent_team.session_state["legal_search"].append({
+    report_archive.put("legal_search", {
         "query": query,
         "results": response.content
-    })
-    agent_team.write_to_storage()
+    }, session_id, query)
+    shared_cache.set("legal_search", shared_key, response.content)
     
     return response.content
 
@@ -204,44 +247,114 @@ app = Playground(
     ]
 ).get_app()
 
-if __name__ == "__main__":
-    serve_playground_app("analisis:app", reload=True)
+# Background report jobs: submit/status/result endpoints plus the scheduler
+app.include_router(jobs_router)
+app.add_event_handler("startup", job_scheduler.start)
+app.add_event_handler("shutdown", job_scheduler.stop)
 
-def generate_legal_report(case_info: str, session_id: str = "default") -> str:
-    """Generate a comprehensive legal analysis report"""
-    agent_team.session_id = session_id
+def create_job_agents() -> Dict[str, Agent]:
+    """Build private copies of the pipeline agents for one background job.
+
+    phi agents keep run state on the instance, so concurrent jobs must not
+    share the module-level agents used by the playground.
+    """
+    return {
+        "classification": clone_agent(case_classification_agent),
+        "criminal_analysis": clone_agent(criminal_analysis_agent),
+        "web_search": clone_agent(web_search_agent),
+        "report_writer": clone_agent(report_writer_agent)
+    }
+
+def find_reusable_analysis(case_info: str) -> Optional[dict]:
+    """Return the classification, criminal analysis and legal search of a near-identical earlier case"""
+    match = near_duplicate_index.find(case_info)
+    if match is None:
+        return None
+    matched_hash, similarity = match
+
+    classification = report_archive.find_by_hash("case_classification", matched_hash, namespace_ttl("case_classification"))
+    criminal_analysis = report_archive.find_by_hash("criminal_analysis", matched_hash, namespace_ttl("criminal_analysis"))
+    legal_search = report_archive.find_by_hash("legal_search", matched_hash, namespace_ttl("legal_search"))
+    if not (classification and criminal_analysis and legal_search):
+        return None
+
+    print(f"Reusing analysis of a near-duplicate case (similarity {similarity:.2f})")
+    return {
+        "classification": classification["classification"],
+        "criminal_analysis": criminal_analysis["analysis"],
+        "legal_articles": legal_search["results"]
+    }
+
+def generate_legal_report(
+    case_info: str,
+    session_id: str = "default",
+    on_stage: Optional[Callable[[str], None]] = None,
+    agents: Optional[Dict[str, Agent]] = None
+) -> str:
+    """Generate a comprehensive legal analysis report
+
+    on_stage, if given, is called with the name of each pipeline stage as it starts.
+    agents, if given, replaces the module-level agents (see create_job_agents).
+    """
+    agents = agents or {}
+    notify = on_stage or (lambda stage: None)
     
     # Check cache
-    if "legal_reports" in agent_team.session_state:
-        cached_result = next((r for r in agent_team.session_state["legal_reports"] if r["case_info"] == case_info), None)
-        if cached_result:
-            return cached_result["report"]
-    
-    # Gather all analysis data
-    classification = classify_case_elements(case_info, session_id)
-    criminal_analysis = analyze_criminal_acts(case_info, session_id)
-    legal_articles = search_legal_articles(case_info, session_id)
-    
-    # Prepare report input
-    report_input = {
-        "case_info": case_info,
-        "classification": classification,
-        "criminal_analysis": criminal_analysis,
-        "legal_articles": legal_articles
-    }
+    shared_key = shared_cache.make_key(case_info)
+    shared_result = shared_cache.get("legal_reports", shared_key)
+    if shared_result is not None:
+        return shared_result
+
+    cached_result = report_archive.find("legal_reports", case_info, max_age=namespace_ttl("legal_reports"))
+    if cached_result:
+        shared_cache.set("legal_reports", shared_key, cached_result["report"])
+        return cached_result["report"]
+    
+    # Near-identical template cases reuse the earlier analyses; only the report is regenerated
+    reused_analysis = find_reusable_analysis(case_info)
+    if reused_analysis:
+        notify("near_duplicate")
+        report_input = {
+            "case_info": case_info,
+            **reused_analysis,
+            "note": (
+                "The classification, criminal analysis and legal articles were produced for a "
+                "near-identical earlier case. Use the names, dates, places and amounts from "
+                "case_info wherever they differ."
+            )
+        }
+    else:
+        # Gather all analysis data
+        notify("classification")
+        classification = classify_case_elements(case_info, session_id, agents.get("classification"))
+        notify("criminal_analysis")
+        criminal_analysis = analyze_criminal_acts(case_info, session_id, agents.get("criminal_analysis"))
+        notify("legal_search")
+        legal_articles = search_legal_articles(case_info, session_id, agents.get("web_search"))
+        near_duplicate_index.add(case_info)
+        
+        # Prepare report input
+        report_input = {
+            "case_info": case_info,
+            "classification": classification,
+            "criminal_analysis": criminal_analysis,
+            "legal_articles": legal_articles
+        }
     
     # Generate report
-    response: RunResponse = report_writer_agent.run(
+    notify("report")
+    response: RunResponse = agents.get("report_writer", report_writer_agent).run(
         f"Generate a legal analysis report based on the following data:\n{json.dumps(report_input, indent=2)}"
     )
     
     # Cache result
-    if "legal_reports" not in agent_team.session_state:
-        agent_team.session_state["legal_reports"] = []
-    agent_team.session_state["legal_reports"].append({
+    report_archive.put("legal_reports", {
         "case_info": case_info,
         "report": response.content
-    })
-    agent_team.write_to_storage()
+    }, session_id, case_info)
+    shared_cache.set("legal_reports", shared_key, response.content)
     
     return response.content
+
+if __name__ == "__main__":
+    serve_playground_app("analisis:app", reload=True)
@@ -0,0 +1,322 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DB_FILE = os.getenv("ARCHIVE_DB_FILE", "tmp/archive.db")
+
+# Keys of the analisis.py session_state lists and the field holding their input text
+SESSION_STATE_KINDS = {
+    "case_classification": ("case_info", "classification"),
+    "criminal_analysis": ("case_facts", "analysis"),
+    "legal_search": ("query", "results"),
+    "legal_reports": ("case_info", "report"),
+}
+
+
+def case_hash(text: str) -> str:
+    """Hash case text after collapsing whitespace, so formatting differences do not matter"""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed archive entries")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if codec == "zlib":
+        return zlib.decompress(payload)
+    return payload
+
+
+class ReportArchive:
+    """Compressed store for generated reports and exported agent history.
+
+    Each payload is JSON-encoded, compressed with zstd (or zlib when the
+    zstandard package is not installed) and stored in its own row, indexed by
+    case hash, session and date so lookups never deserialise unrelated data.
+
+    analisis.py reads and writes its pipeline results here. Agent history is
+    different: phi keeps reading and writing it in its own SqlAgentStorage, so
+    the "history" entries written by migrate_database are a compressed
+    point-in-time export for reporting and retention, not a replacement
+    storage backend, and do not shrink the agent databases.
+    """
+
+    def __init__(self, db_file: str = ARCHIVE_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS archive (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                source_db TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                session_id TEXT,
+                case_hash TEXT,
+                created_at REAL NOT NULL,
+                codec TEXT NOT NULL,
+                raw_size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_archive_case ON archive (case_hash, kind);
+            CREATE INDEX IF NOT EXISTS idx_archive_session ON archive (session_id, kind);
+            CREATE INDEX IF NOT EXISTS idx_archive_created ON archive (created_at);
+            CREATE TABLE IF NOT EXISTS migrations (
+                source_db TEXT NOT NULL,
+                source TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                updated_at REAL,
+                PRIMARY KEY (source_db, source, session_id)
+            );
+            """
+        )
+        # Archives created before source_db was stored lack the column; take it from the migrations log
+        columns = {row[1] for row in self._connect().execute("PRAGMA table_info(archive)")}
+        if "source_db" not in columns:
+            self._connect().executescript(
+                """
+                ALTER TABLE archive ADD COLUMN source_db TEXT NOT NULL DEFAULT '';
+                UPDATE archive SET source_db = COALESCE((
+                    SELECT m.source_db FROM migrations m
+                    WHERE m.source = archive.source AND m.session_id = archive.session_id
+                ), '') WHERE source != '';
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def put(
+        self,
+        kind: str,
+        data: Any,
+        session_id: Optional[str] = None,
+        case_text: Optional[str] = None,
+        source: str = "",
+        created_at: Optional[float] = None,
+        source_db: str = "",
+    ) -> int:
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        codec, payload = compress(raw)
+        cursor = self._connect().execute(
+            "INSERT INTO archive (kind, source_db, source, session_id, case_hash, created_at, codec, raw_size, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                kind,
+                source_db,
+                source,
+                session_id,
+                case_hash(case_text) if case_text is not None else None,
+                created_at if created_at is not None else time.time(),
+                codec,
+                len(raw),
+                payload,
+            ),
+        )
+        return cursor.lastrowid
+
+    def find(self, kind: str, case_text: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the latest entry of this kind for the case, or None.
+
+        With max_age (seconds), entries older than that are ignored.
+        """
+        return self.find_by_hash(kind, case_hash(case_text), max_age)
+
+    def find_by_hash(self, kind: str, hashed_case: str, max_age: Optional[float] = None) -> Optional[Any]:
+        min_created_at = time.time() - max_age if max_age else 0
+        row = self._connect().execute(
+            "SELECT codec, payload FROM archive WHERE case_hash = ? AND kind = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (hashed_case, kind, min_created_at),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(decompress(*row))
+
+    def get_session(self, session_id: str, kind: Optional[str] = None) -> List[Any]:
+        query = "SELECT codec, payload FROM archive WHERE session_id = ?"
+        params: list = [session_id]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        rows = self._connect().execute(query + " ORDER BY created_at", params).fetchall()
+        return [json.loads(decompress(codec, payload)) for codec, payload in rows]
+
+    def apply_retention(self, max_age_days: Optional[float] = None, keep_per_session: Optional[int] = None) -> int:
+        """Delete entries older than max_age_days and all but the newest keep_per_session per session and kind"""
+        conn = self._connect()
+        deleted = 0
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            deleted += conn.execute("DELETE FROM archive WHERE created_at < ?", (cutoff,)).rowcount
+        if keep_per_session is not None:
+            deleted += conn.execute(
+                """
+                DELETE FROM archive WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY session_id, kind ORDER BY created_at DESC
+                        ) AS rank
+                        FROM archive WHERE session_id IS NOT NULL
+                    ) WHERE rank > ?
+                )
+                """,
+                (keep_per_session,),
+            ).rowcount
+        return deleted
+
+    def migrated_at(self, source_db: str, source: str, session_id: str) -> Optional[float]:
+        """Return the source row's updated_at when it was last migrated, or None if it never was"""
+        row = self._connect().execute(
+            "SELECT updated_at FROM migrations WHERE source_db = ? AND source = ? AND session_id = ?",
+            (source_db, source, session_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def replace_migrated(self, source_db: str, source: str, session_id: str, updated_at: Optional[float],
+                         entries: List[tuple]) -> None:
+        """Swap the archived entries of one source row for `entries` (kind, data, case_text, created_at)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM archive WHERE source_db = ? AND source = ? AND session_id = ?",
+                (source_db, source, session_id),
+            )
+            for kind, data, case_text, created_at in entries:
+                self.put(kind, data, session_id, case_text, source=source, created_at=created_at, source_db=source_db)
+            conn.execute(
+                "INSERT OR REPLACE INTO migrations (source_db, source, session_id, updated_at) VALUES (?, ?, ?, ?)",
+                (source_db, source, session_id, updated_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def vacuum(self) -> None:
+        self._connect().execute("VACUUM")
+
+    def checkpoint(self) -> None:
+        """Fold the WAL file back into the main database file"""
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def stats(self) -> Dict[str, int]:
+        entries, raw_size, stored_size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM archive"
+        ).fetchone()
+        return {"entries": entries, "raw_size": raw_size, "stored_size": stored_size}
+
+
+def load_json(value: Any) -> Any:
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def storage_tables(conn: sqlite3.Connection) -> List[str]:
+    """Tables created by phi's SqlAgentStorage / SqlWorkflowStorage (they all have session_id and memory)"""
+    tables = []
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"):
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')}
+        if {"session_id", "memory", "session_data"} <= columns:
+            tables.append(name)
+    return tables
+
+
+def migrate_database(archive: ReportArchive, db_file: str, prune: bool = False) -> Dict[str, Tuple[int, int]]:
+    """Copy session history and cached reports from a phi agent/workflow database into the archive.
+
+    Rows already migrated are skipped; rows updated since their last migration
+    replace their earlier archive entries. Agent history (the memory column) is
+    only exported: phi still reads it from the source database, so it is never
+    pruned. With prune, the analisis.py result lists are removed from workflow
+    session_state, since analisis.py reads them from the archive.
+
+    Returns (entries archived, sessions skipped) per table.
+    """
+    source_db = str(Path(db_file).resolve())
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    counts = {}
+    try:
+        for table in storage_tables(conn):
+            migrated = skipped = 0
+            for row in conn.execute(f'SELECT * FROM "{table}"').fetchall():
+                session_id = row["session_id"]
+                updated_at = row["updated_at"] or row["created_at"]
+                session_data = load_json(row["session_data"]) or {}
+                session_state = session_data.get("session_state", {}) if isinstance(session_data, dict) else {}
+
+                if archive.migrated_at(source_db, table, session_id) == updated_at:
+                    skipped += 1
+                else:
+                    created_at = row["created_at"] or time.time()
+                    entries = []
+                    memory = load_json(row["memory"])
+                    if memory:
+                        entries.append(("history", memory, None, created_at))
+
+                    # Workflow rows keep the analisis.py caches in session_state
+                    for kind, (input_field, _) in SESSION_STATE_KINDS.items():
+                        for entry in session_state.get(kind, []):
+                            entries.append((kind, entry, entry.get(input_field), created_at))
+
+                    archive.replace_migrated(source_db, table, session_id, updated_at, entries)
+                    migrated += len(entries)
+
+                if prune and any(kind in session_state for kind in SESSION_STATE_KINDS):
+                    for kind in SESSION_STATE_KINDS:
+                        session_state.pop(kind, None)
+                    conn.execute(
+                        f'UPDATE "{table}" SET session_data = ? WHERE session_id = ?',
+                        (json.dumps(session_data), session_id),
+                    )
+            counts[table] = (migrated, skipped)
+
+        if prune:
+            conn.commit()
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return counts
+
+
+_report_archive: Optional[ReportArchive] = None
+
+
+def get_report_archive() -> ReportArchive:
+    """Return the process-wide archive instance, opening it on first use"""
+    global _report_archive
+    if _report_archive is None:
+        _report_archive = ReportArchive()
+    return _report_archive
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from archive import ARCHIVE_DB_FILE, ReportArchive, load_json, migrate_database, storage_tables
+
+
+cli = typer.Typer(help="Compressed archive for generated reports and agent sessions")
+
+
+@cli.command()
+def migrate(
+    db_files: List[Path] = typer.Argument(..., help="Agent/workflow SQLite databases to migrate, e.g. tmp/agents.db tmp/workflows.db"),
+    archive_db: str = typer.Option(ARCHIVE_DB_FILE, help="Archive database to write to"),
+    prune: bool = typer.Option(False, help="Remove the analisis.py result caches from workflow session_state once archived"),
+):
+    """Copy session history and cached reports from existing databases into the archive.
+
+    Rows already migrated are skipped; rows updated since their last migration
+    replace their earlier archive entries. Agent history is exported, not moved:
+    phi keeps reading it from the source database, so it is never pruned.
+    """
+    archive = ReportArchive(archive_db)
+
+    for db_file in db_files:
+        for table, (migrated, skipped) in migrate_database(archive, str(db_file), prune).items():
+            print(f"{db_file}:{table}: {migrated} entries archived, {skipped} sessions already migrated")
+
+    stats = archive.stats()
+    print(f"Archive: {stats['entries']} entries, {stats['raw_size']} bytes raw, {stats['stored_size']} bytes stored")
+
+
+@cli.command()
+def retention(
+    archive_db: str = typer.Option(ARCHIVE_DB_FILE, help="Archive database"),
+    max_age_days: Optional[float] = typer.Option(None, help="Delete entries older than this many days"),
+    keep_per_session: Optional[int] = typer.Option(None, help="Keep only the newest N entries per session and kind"),
+):
+    """Apply retention policies and vacuum the archive"""
+    archive = ReportArchive(archive_db)
+    deleted = archive.apply_retention(max_age_days, keep_per_session)
+    archive.vacuum()
+    print(f"Deleted {deleted} entries")
+
+
+@cli.command()
+def benchmark(
+    db_file: Path = typer.Argument(..., help="Source agent/workflow database"),
+    archive_db: str = typer.Option(ARCHIVE_DB_FILE, help="Archive database migrated from it"),
+):
+    """Compare size and per-session load time of a source database and the archive"""
+    conn = sqlite3.connect(db_file)
+    archive = ReportArchive(archive_db)
+
+    # Both sides are timed from query to decoded payload, one session at a time
+    source_time = 0.0
+    archive_time = 0.0
+    sessions = 0
+    for table in storage_tables(conn):
+        for (session_id,) in conn.execute(f'SELECT session_id FROM "{table}"').fetchall():
+            start_time = time.time()
+            for memory, session_data in conn.execute(
+                f'SELECT memory, session_data FROM "{table}" WHERE session_id = ?', (session_id,)
+            ):
+                load_json(memory)
+                load_json(session_data)
+            source_time += time.time() - start_time
+
+            start_time = time.time()
+            archive.get_session(session_id)
+            archive_time += time.time() - start_time
+            sessions += 1
+    conn.close()
+
+    archive.checkpoint()
+    stats = archive.stats()
+    print(f"Sessions: {sessions}")
+    print(f"Source file: {os.path.getsize(db_file)} bytes, archive file: {os.path.getsize(archive_db)} bytes")
+    print(f"Payloads: {stats['raw_size']} bytes raw, {stats['stored_size']} bytes compressed "
+          f"({stats['stored_size'] / max(stats['raw_size'], 1):.1%})")
+    print(f"Load time: source {source_time * 1000:.1f}ms, archive {archive_time * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    cli()
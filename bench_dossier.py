@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+
+import typer
+
+from analisis import run_classification, run_criminal_analysis
+from dossier import split_dossier
+
+
+def timed(label: str, func, *args, **kwargs) -> float:
+    start_time = time.time()
+    func(*args, **kwargs)
+    elapsed = time.time() - start_time
+    print(f"  {label}: {elapsed:.2f}s")
+    return elapsed
+
+
+def bench_dossier(
+    path: Path = typer.Argument(..., help="Text file containing the dossier"),
+    runs: int = typer.Option(1, help="Number of runs per mode"),
+):
+    """Compare single-shot and map-reduce latency for classification and criminal analysis"""
+    dossier = path.read_text(encoding="utf-8")
+    print(f"Dossier: {len(dossier)} characters, {len(split_dossier(dossier))} chunks\n")
+
+    totals = {}
+    for mode, long_input in (("single-shot", False), ("map-reduce", True)):
+        total = 0.0
+        for run in range(runs):
+            print(f"{mode} run {run + 1}:")
+            total += timed("classification", run_classification, dossier, long_input=long_input)
+            total += timed("criminal analysis", run_criminal_analysis, dossier, long_input=long_input)
+        totals[mode] = total / runs
+
+    print("\n=== Average Latency ===")
+    for mode, total in totals.items():
+        print(f"{mode:>12}: {total:.2f}s")
+    print(f"     speedup: {totals['single-shot'] / totals['map-reduce']:.2f}x")
+
+
+if __name__ == "__main__":
+    typer.run(bench_dossier)
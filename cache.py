@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_DB_FILE = os.getenv("CACHE_DB_FILE", "tmp/cache.db")
+
+# Seconds before an entry expires; CACHE_TTL_<NAMESPACE> overrides a single namespace, 0 disables expiry
+DEFAULT_TTL = float(os.getenv("CACHE_TTL", "86400"))
+NAMESPACE_TTLS = {
+    "embedding": 30 * 86400,
+    "decision_search": 3600,
+}
+
+# Record hits and misses per namespace (used by loadtest.py); off by default to avoid a write per read
+CACHE_STATS = os.getenv("CACHE_STATS", "") == "1"
+
+
+def namespace_ttl(namespace: str) -> float:
+    override = os.getenv(f"CACHE_TTL_{namespace.upper()}")
+    if override is not None:
+        return float(override)
+    return NAMESPACE_TTLS.get(namespace, DEFAULT_TTL)
+
+
+class SharedCache:
+    """Key/value cache backed by SQLite in WAL mode.
+
+    Every uvicorn worker opens the same database file, so a response,
+    embedding or search result stored by one worker is a hit for all others.
+    Values are stored as JSON; keys are hashed so long case texts stay cheap
+    to index. Entries expire after their namespace TTL and expired rows are
+    purged whenever that namespace is written.
+    """
+
+    def __init__(self, db_file: str = CACHE_DB_FILE, record_stats: bool = CACHE_STATS):
+        self.db_file = db_file
+        self.record_stats = record_stats
+        self._local = threading.local()
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_created ON cache (namespace, created_at);
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            return None
+        ttl = namespace_ttl(namespace)
+        if row is not None and ttl > 0 and time.time() - row[1] > ttl:
+            row = None
+        self._record(namespace, hit=row is not None)
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        now = time.time()
+        ttl = namespace_ttl(namespace)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), now),
+            )
+            if ttl > 0:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                    (namespace, now - ttl),
+                )
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+
+    def _record(self, namespace: str, hit: bool) -> None:
+        if not self.record_stats:
+            return
+        column = "hits" if hit else "misses"
+        try:
+            self._connect().execute(
+                f"INSERT INTO cache_stats (namespace, {column}) VALUES (?, 1) "
+                f"ON CONFLICT (namespace) DO UPDATE SET {column} = {column} + 1",
+                (namespace,),
+            )
+        except sqlite3.Error as e:
+            print(f"Cache stats error: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        rows = self._connect().execute("SELECT namespace, hits, misses FROM cache_stats").fetchall()
+        return {namespace: {"hits": hits, "misses": misses} for namespace, hits, misses in rows}
+
+    def reset_stats(self) -> None:
+        self._connect().execute("DELETE FROM cache_stats")
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Return the process-wide cache instance, opening it on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SharedCache()
+    return _shared_cache
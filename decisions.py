@@ -0,0 +1,52 @@
+from typing import Dict, List
+
+# match_documents returns chunks, so ask for more rows than the number of decisions wanted
+OVERFETCH_FACTOR = 4
+MAX_MATCH_COUNT = 100
+
+
+def overfetch_count(top_k: int, factor: int = OVERFETCH_FACTOR) -> int:
+    return min(top_k * factor, MAX_MATCH_COUNT)
+
+
+def decision_key(doc: Dict) -> str:
+    """Identify the decision a chunk belongs to, falling back to its file when nomor_putusan is missing"""
+    metadata = doc.get('metadata') or {}
+    return (
+        metadata.get('nomor_putusan')
+        or doc.get('file_url')
+        or doc.get('file_path')
+        or str(doc.get('id'))
+    )
+
+
+def group_by_decision(documents: List[Dict], top_k: int) -> List[Dict]:
+    """Group chunk rows by decision and return the top_k decisions.
+
+    Each result is the best-matching chunk of its decision with extra keys:
+    'decision_score' (the similarity of that chunk, used for ranking, so a
+    long decision with many weak chunks does not outrank a strong match),
+    'chunk_count', and 'chunks' (the chunk contents, best first).
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for doc in documents:
+        groups.setdefault(decision_key(doc), []).append(doc)
+
+    decisions = []
+    for chunks in groups.values():
+        chunks = sorted(chunks, key=lambda d: d.get('similarity', 0), reverse=True)
+        decisions.append({
+            **chunks[0],
+            'decision_score': chunks[0].get('similarity', 0),
+            'chunk_count': len(chunks),
+            'chunks': [chunk.get('content') or '' for chunk in chunks],
+        })
+
+    decisions.sort(key=lambda d: d['decision_score'], reverse=True)
+    return decisions[:top_k]
+
+
+def needs_more_rows(documents: List[Dict], match_count: int, top_k: int) -> bool:
+    """True when the fetch was full but still yielded fewer than top_k distinct decisions"""
+    distinct = len({decision_key(doc) for doc in documents})
+    return distinct < top_k and len(documents) >= match_count and match_count < MAX_MATCH_COUNT
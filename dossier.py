@@ -0,0 +1,203 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from phi.agent import Agent
+
+# Dossiers longer than this are split and processed with map-reduce
+LONG_INPUT_CHARS = 12000
+CHUNK_CHARS = 8000
+MAP_WORKERS = 4
+
+# Section headers commonly found in BAP dossiers
+SECTION_PATTERN = re.compile(
+    r"^\s*(BERITA ACARA|BAP\b|KETERANGAN SAKSI|KETERANGAN TERSANGKA|KETERANGAN AHLI|"
+    r"BARANG BUKTI|PERTANYAAN|RESUME|KESIMPULAN|PASAL|[IVX]+\.\s|\d+\.\s+[A-Z])",
+    re.IGNORECASE,
+)
+
+
+def split_dossier(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split a dossier into chunks of at most chunk_chars, breaking at section headers or paragraphs"""
+    sections: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if SECTION_PATTERN.match(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+
+    # Break oversized sections at paragraph boundaries, then at hard limits
+    pieces: List[str] = []
+    for section in sections:
+        if len(section) <= chunk_chars:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r"\n\s*\n", section):
+            while len(paragraph) > chunk_chars:
+                pieces.append(paragraph[:chunk_chars])
+                paragraph = paragraph[chunk_chars:]
+            pieces.append(paragraph)
+
+    # Pack pieces greedily so each chunk is as full as possible
+    chunks: List[str] = []
+    buffer = ""
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        if buffer and len(buffer) + len(piece) + 2 > chunk_chars:
+            chunks.append(buffer)
+            buffer = piece
+        else:
+            buffer = f"{buffer}\n\n{piece}" if buffer else piece
+    if buffer:
+        chunks.append(buffer)
+    return chunks
+
+
+def clone_agent(agent: "Agent") -> "Agent":
+    """Create a storage-less copy of an agent so it can run concurrently with the original"""
+    # Imported here so the text helpers in this module work without phi installed
+    from phi.agent import Agent
+
+    return Agent(
+        name=agent.name,
+        model=agent.model.__class__(id=agent.model.id, api_key=getattr(agent.model, "api_key", None)),
+        description=agent.description,
+        instructions=agent.instructions,
+        tools=agent.tools,
+        markdown=agent.markdown,
+        show_tool_calls=agent.show_tool_calls,
+    )
+
+
+def map_chunks(agent: "Agent", prompt: str, chunks: List[str], max_workers: int = MAP_WORKERS) -> List[str]:
+    """Run the agent over every chunk in parallel and return the partial outputs in order"""
+    def run_chunk(indexed_chunk) -> str:
+        index, chunk = indexed_chunk
+        response = clone_agent(agent).run(
+            f"{prompt}\n(Part {index + 1} of {len(chunks)} of the dossier)\n{chunk}"
+        )
+        return response.content or ""
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_chunk, enumerate(chunks)))
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"[*_`#]", "", text).lower()
+    text = re.sub(r"^\s*(\d+[.)]|[-+•])\s*", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _is_heading(line: str) -> bool:
+    """Markdown headings and unindented labels such as "Saksi-saksi:" or "1. **Witnesses**:" start a section.
+
+    Bulleted labels ("- Budi Santoso:") stay items, since the agents list
+    witnesses and evidence that way.
+    """
+    stripped = line.strip()
+    if stripped.startswith("#"):
+        return True
+    return (
+        stripped.strip("*_").strip().endswith(":")
+        and not re.match(r"^[-+*•]\s", stripped)
+        and not line[:1].isspace()
+    )
+
+
+def _entity(line: str) -> tuple:
+    """Split an item into its dedup key and detail.
+
+    "Budi Santoso: saw the theft" and "**Budi Santoso** - saw the theft" are
+    keyed on the name. Only short prefixes count as a name, so prose that
+    happens to contain a colon is keyed on its whole text.
+    """
+    text = re.sub(r"^\s*([-+*•]|\d+[.)])\s*", "", line).strip()
+    match = re.match(r"^(.+?)(?::(?=\s|$)|\s[-–]\s)(.*)$", text)
+    if match and 0 < len(_normalize(match.group(1)).split()) <= 6:
+        return _normalize(match.group(1)), match.group(2).strip()
+    return _normalize(text), ""
+
+
+def _merge_item(parent: Dict, line: str) -> Dict:
+    """Add a line under parent, folding it into an earlier item with the same key; return its node"""
+    key, detail = _entity(line)
+    if not key:
+        return parent
+    node = parent["index"].get(key)
+    if node is None:
+        node = {"text": line.rstrip(), "details": {_normalize(detail)}, "children": [], "index": {}}
+        parent["index"][key] = node
+        parent["children"].append(node)
+    elif _normalize(detail) not in node["details"]:
+        # Same person or item described differently in another chunk: keep both descriptions
+        separator = "; " if any(node["details"]) else ": "
+        node["text"] += separator + detail
+        node["details"].add(_normalize(detail))
+    return node
+
+
+def _render(node: Dict) -> List[str]:
+    lines = []
+    for child in node["children"]:
+        lines.append(child["text"])
+        lines.extend(_render(child))
+    return lines
+
+
+def merge_sections(partials: List[str]) -> str:
+    """Merge markdown outputs section by section, dropping items already seen in other chunks.
+
+    Items are deduplicated by the name before ":" or " - ", within their
+    section and, for nested bullets, within their parent item, so a witness
+    mentioned in several chunks is kept once with every distinct detail.
+    Every heading found in the partials is kept, in the order it first
+    appeared.
+    """
+    headings: Dict[str, str] = {}
+    roots: Dict[str, Dict] = {}
+
+    for partial in partials:
+        section_key = ""
+        stack: List[tuple] = []
+        for line in partial.splitlines():
+            if not line.strip():
+                continue
+            if _is_heading(line):
+                section_key = _normalize(line)
+                headings.setdefault(section_key, line.strip())
+                stack = []
+                continue
+            headings.setdefault(section_key, "")
+            root = roots.setdefault(section_key, {"children": [], "index": {}})
+            # Nest each line under the closest previous line that is indented less
+            indent = len(line) - len(line.lstrip())
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            parent = stack[-1][1] if stack else root
+            stack.append((indent, _merge_item(parent, line)))
+
+    blocks = []
+    for section_key, heading in headings.items():
+        lines = _render(roots[section_key]) if section_key in roots else []
+        block = "\n".join(([heading] if heading else []) + lines)
+        if block:
+            blocks.append(block)
+    return "\n\n".join(blocks)
+
+
+def reduce_partials(agent: "Agent", prompt: str, partials: List[str]) -> str:
+    """Combine deduplicated partial outputs into one answer with a final agent run"""
+    merged = merge_sections(partials)
+    response = agent.run(
+        f"{prompt}\n"
+        "The dossier was analysed in parts. Combine the following partial results into one "
+        "consistent analysis, keeping every distinct person, item and fact exactly once:\n"
+        f"{merged}"
+    )
+    return response.content
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+JOBS_DB_FILE = os.getenv("JOBS_DB_FILE", "tmp/jobs.db")
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+# A running job whose lease is not renewed within this many seconds is treated as abandoned
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+class JobQueue:
+    """Persistent report-generation queue stored in SQLite.
+
+    Jobs are claimed inside an IMMEDIATE transaction, so several server
+    workers can poll the same queue without running a job twice. The next job
+    is chosen by priority first, then by how many jobs its user already has
+    running, then by age, so one busy user cannot starve the others.
+
+    A claimed job holds a lease that the scheduler renews with a heartbeat.
+    Jobs whose lease has expired (their process died or was redeployed) are
+    requeued, or failed after JOB_MAX_ATTEMPTS, and do not count towards
+    fairness. The attempt number returned by claim_next is the claim token:
+    heartbeats, progress events and results are only accepted from the
+    current attempt, so a worker that lost its lease cannot overwrite the job.
+    """
+
+    def __init__(self, db_file: str = JOBS_DB_FILE, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                case_info TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority, created_at);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id);
+            """
+        )
+        # Queues created before leases were introduced lack these columns
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_expires_at" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, case_info: str, user_id: str = "user", session_id: Optional[str] = None, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, user_id, session_id, priority, status, case_info, created_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, user_id, session_id or f"job-{job_id}", priority, case_info, time.time()),
+        )
+        self.add_event(job_id, "queued")
+        return job_id
+
+    def _recover_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT id, attempts FROM jobs WHERE status = 'running' AND lease_expires_at < ?",
+            (now,),
+        ).fetchall()
+        for job in expired:
+            if job["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                    (f"Lease expired after {job['attempts']} attempts", now, job["id"]),
+                )
+                stage = "failed"
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', lease_expires_at = NULL WHERE id = ?",
+                    (job["id"],),
+                )
+                stage = "requeued"
+            conn.execute(
+                "INSERT INTO job_events (job_id, stage, created_at) VALUES (?, ?, ?)",
+                (job["id"], stage, now),
+            )
+
+    def recover_expired(self) -> None:
+        """Requeue or fail running jobs whose lease has expired"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover_expired(conn, time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim_next(self) -> Optional[Dict]:
+        """Atomically move the next queued job to running and return it; its "attempts" is the claim token"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            self._recover_expired(conn, now)
+            row = conn.execute(
+                """
+                SELECT j.* FROM jobs j
+                WHERE j.status = 'queued'
+                ORDER BY
+                    j.priority DESC,
+                    (SELECT COUNT(*) FROM jobs r
+                     WHERE r.user_id = j.user_id AND r.status = 'running' AND r.lease_expires_at >= ?) ASC,
+                    j.created_at ASC
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            job = None
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, lease_expires_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (now, now + self.lease_seconds, row["id"]),
+                )
+                job = {**dict(row), "status": "running", "attempts": row["attempts"] + 1}
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job
+
+    def _insert_event(self, job_id: str, stage: str, now: float) -> None:
+        self._connect().execute(
+            "INSERT INTO job_events (job_id, stage, created_at) VALUES (?, ?, ?)",
+            (job_id, stage, now),
+        )
+
+    def heartbeat(self, job_id: str, attempt: int) -> bool:
+        """Renew the lease; False when this attempt no longer owns the job"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+            (time.time() + self.lease_seconds, job_id, attempt),
+        )
+        return cursor.rowcount == 1
+
+    def add_event(self, job_id: str, stage: str, attempt: Optional[int] = None) -> bool:
+        """Record a progress event; with an attempt, only while that attempt owns the job (renewing its lease)"""
+        if attempt is not None and not self.heartbeat(job_id, attempt):
+            return False
+        self._insert_event(job_id, stage, time.time())
+        return True
+
+    def complete(self, job_id: str, attempt: int, result: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (result, now, job_id, attempt),
+        )
+        if cursor.rowcount != 1:
+            return False
+        self._insert_event(job_id, "done", now)
+        return True
+
+    def fail(self, job_id: str, attempt: int, error: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (error, now, job_id, attempt),
+        )
+        if cursor.rowcount != 1:
+            return False
+        self._insert_event(job_id, "failed", now)
+        return True
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def get_events(self, job_id: str) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT stage, created_at FROM job_events WHERE job_id = ? ORDER BY rowid",
+            (job_id,),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class JobScheduler:
+    """Runs up to `concurrency` report pipelines at once from the job queue"""
+
+    def __init__(self, queue: JobQueue, concurrency: int = JOB_CONCURRENCY, poll_interval: float = 1.0):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        # Jobs left running by a previous process are picked up again once their lease expires
+        self.queue.recover_expired()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            job = await asyncio.to_thread(self.queue.claim_next)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            run = asyncio.create_task(asyncio.to_thread(self._run_job, job))
+            # Renew the lease while the pipeline runs, so long stages are not mistaken for dead workers
+            while not run.done():
+                await asyncio.wait({run}, timeout=self.queue.lease_seconds / 3)
+                if not run.done():
+                    await asyncio.to_thread(self.queue.heartbeat, job["id"], job["attempts"])
+            await run
+
+    def _run_job(self, job: Dict) -> None:
+        # Imported here so this module can be mounted by analisis.py without a circular import
+        from analisis import generate_legal_report, create_job_agents
+
+        job_id = job["id"]
+        attempt = job["attempts"]
+        try:
+            report = generate_legal_report(
+                job["case_info"],
+                job["session_id"],
+                on_stage=lambda stage: self.queue.add_event(job_id, stage, attempt),
+                agents=create_job_agents(),
+            )
+            accepted = self.queue.complete(job_id, attempt, report)
+        except Exception as e:
+            print(f"Error in job {job_id}: {e}")
+            accepted = self.queue.fail(job_id, attempt, str(e))
+        if not accepted:
+            print(f"Dropped result of job {job_id} attempt {attempt}: the job was reclaimed")
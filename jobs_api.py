@@ -0,0 +1,53 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from jobs import JobQueue, JobScheduler
+
+
+class JobRequest(BaseModel):
+    case_info: str
+    user_id: str = "user"
+    session_id: Optional[str] = None
+    priority: int = 0
+
+
+job_queue = JobQueue()
+job_scheduler = JobScheduler(job_queue)
+jobs_router = APIRouter(prefix="/v1/jobs", tags=["jobs"])
+
+
+@jobs_router.post("")
+def submit_job(request: JobRequest):
+    job_id = job_queue.submit(request.case_info, request.user_id, request.session_id, request.priority)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@jobs_router.get("/{job_id}")
+def get_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "user_id": job["user_id"],
+        "priority": job["priority"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "events": job_queue.get_events(job_id),
+    }
+
+
+@jobs_router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return {"job_id": job_id, "report": job["result"]}
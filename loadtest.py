@@ -0,0 +1,156 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+import typer
+
+from cache import SharedCache, CACHE_DB_FILE
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.time() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not start within {timeout:.0f}s")
+
+
+async def run_status_load(base_url: str, path: str, requests: int, concurrency: int) -> float:
+    """Send `requests` GET requests with `concurrency` in flight and return requests/sec"""
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async def hit() -> None:
+            nonlocal failures
+            async with semaphore:
+                try:
+                    response = await client.get(f"{base_url}{path}")
+                    if response.status_code >= 400:
+                        failures += 1
+                except httpx.HTTPError:
+                    failures += 1
+
+        start_time = time.time()
+        await asyncio.gather(*(hit() for _ in range(requests)))
+        total_time = time.time() - start_time
+
+    if failures:
+        print(f"  {failures} of {requests} requests failed")
+    return requests / total_time
+
+
+async def run_jobs_load(base_url: str, cases: List[str], requests: int, concurrency: int, timeout: float = 600.0) -> float:
+    """Submit `requests` report jobs cycling over `cases`, wait for all of them and return jobs/sec.
+
+    Every case after its first submission is served by the shared report cache,
+    whichever worker picks the job up.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async def run_job(index: int) -> None:
+            nonlocal failures
+            async with semaphore:
+                response = await client.post(f"{base_url}/v1/jobs", json={
+                    "case_info": cases[index % len(cases)],
+                    "user_id": f"loadtest-{index % concurrency}",
+                })
+                job_id = response.json()["job_id"]
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    status = (await client.get(f"{base_url}/v1/jobs/{job_id}")).json()["status"]
+                    if status in ("done", "failed"):
+                        failures += status == "failed"
+                        return
+                    await asyncio.sleep(0.2)
+                failures += 1
+
+        start_time = time.time()
+        await asyncio.gather(*(run_job(i) for i in range(requests)))
+        total_time = time.time() - start_time
+
+    if failures:
+        print(f"  {failures} of {requests} jobs failed or timed out")
+    return requests / total_time
+
+
+def print_cache_stats(cache: SharedCache) -> None:
+    stats = cache.stats()
+    hits = sum(s["hits"] for s in stats.values())
+    lookups = hits + sum(s["misses"] for s in stats.values())
+    print(f"  Cache hit rate: {hits / max(lookups, 1):.1%} ({hits}/{lookups})")
+    for namespace, s in sorted(stats.items()):
+        print(f"    {namespace}: {s['hits']} hits, {s['misses']} misses")
+
+
+def loadtest(
+    workers: List[int] = typer.Option([1, 2, 4], help="Worker counts to benchmark"),
+    mode: str = typer.Option("status", help="'status' hits a static endpoint, 'jobs' drives the cached report pipeline"),
+    app: Optional[str] = typer.Option(None, help="ASGI app to serve (default: playground:app for status, analisis:app for jobs)"),
+    path: str = typer.Option("/v1/playground/status", help="Endpoint to request in status mode"),
+    cases: Optional[Path] = typer.Option(None, help="Jobs mode: text file of case descriptions separated by lines of '---'"),
+    port: int = typer.Option(7777, help="Port for the server under test"),
+    requests: int = typer.Option(2000, help="Requests (or jobs) per worker count"),
+    concurrency: int = typer.Option(64, help="Requests in flight at once"),
+):
+    """Start serve.py with each worker count and measure throughput and shared cache hit rate"""
+    if mode not in ("status", "jobs"):
+        raise typer.BadParameter("mode must be 'status' or 'jobs'")
+    if mode == "jobs" and cases is None:
+        raise typer.BadParameter("--cases is required in jobs mode")
+    app = app or ("analisis:app" if mode == "jobs" else "playground:app")
+    case_texts = [c.strip() for c in cases.read_text(encoding="utf-8").split("\n---\n") if c.strip()] if cases else []
+
+    base_url = f"http://127.0.0.1:{port}"
+    cache = SharedCache(os.getenv("CACHE_DB_FILE", CACHE_DB_FILE), record_stats=True)
+    results = []
+
+    for worker_count in workers:
+        server = subprocess.Popen(
+            [
+                sys.executable, "serve.py",
+                "--app", app,
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--workers", str(worker_count),
+            ],
+            env={**os.environ, "CACHE_STATS": "1"},
+        )
+        try:
+            asyncio.run(wait_until_ready(f"{base_url}/docs"))
+            if mode == "jobs":
+                # Warm the shared cache once per case, then measure the cached path
+                asyncio.run(run_jobs_load(base_url, case_texts, len(case_texts), concurrency))
+                cache.reset_stats()
+                rate = asyncio.run(run_jobs_load(base_url, case_texts, requests, concurrency))
+            else:
+                # Warm every worker before measuring
+                asyncio.run(run_status_load(base_url, path, worker_count * 10, concurrency))
+                cache.reset_stats()
+                rate = asyncio.run(run_status_load(base_url, path, requests, concurrency))
+            results.append((worker_count, rate))
+            print(f"Workers: {worker_count}, {mode}/sec: {rate:.1f}")
+            print_cache_stats(cache)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("\n=== Load Test Results ===")
+    baseline = results[0][1] if results else 0
+    for worker_count, rate in results:
+        print(f"{worker_count:>3} workers: {rate:>8.1f} {mode}/s ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    typer.run(loadtest)
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from archive import case_hash
+
+NEAR_DUP_DB_FILE = os.getenv("NEAR_DUP_DB_FILE", "tmp/near_duplicates.db")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so every worker process computes the same signatures
+_rng = random.Random(20241229)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+# Numbers right after these words identify the offence or statute, so they are never masked
+LEGAL_KEYWORDS = {"pasal", "ayat", "huruf", "jo", "juncto", "uu", "undang-undang", "perppu", "perpu", "pp", "kuhp", "kuhap"}
+LEGAL_WINDOW = 4
+
+# All-caps tokens that are not names
+KEEP_UPPERCASE = {"KUHP", "KUHAP", "UU", "ITE", "PERPPU", "PP", "BAP", "WIB", "WITA", "WIT", "CCTV", "RP", "SHM", "TKP"}
+
+# Roles and titles that often start a sentence right before a name ("Tersangka Andi ...")
+ROLE_WORDS = {
+    "saksi", "korban", "tersangka", "terdakwa", "pelapor", "terlapor", "pelaku", "petugas",
+    "penyidik", "anggota", "bapak", "ibu", "saudara", "sdr", "sdri", "kepada", "bahwa",
+}
+
+LEGAL_REFERENCE_PATTERN = re.compile(
+    r"\bpasal\s+\d+[a-z]?(?:\s+ayat\s*\(?\d+\)?)?"
+    r"|\b(?:uu|undang-undang|perppu|pp)\s+(?:no\.?|nomor)\s*\d+\s+tahun\s+\d{4}",
+    re.IGNORECASE,
+)
+
+
+def _strip_punctuation(word: str) -> str:
+    return re.sub(r"^[^\w]+|[^\w]+$", "", word)
+
+
+def _is_abbreviation(word: str) -> bool:
+    """Short capitalised words with a trailing dot, such as Jl., No., Sdr. or Rp., do not end a sentence"""
+    return bool(re.match(r"^[A-Z][a-z]{0,3}\.$", word))
+
+
+def _is_capitalised(word: str) -> bool:
+    return bool(re.match(r"^[A-Z][a-z]+", word))
+
+
+def normalize_case_text(text: str) -> str:
+    """Mask names, dates and amounts, so template cases that differ only in those look alike.
+
+    Capitalised words inside a sentence and all-caps names (as written in BAP
+    dossiers) become "nama", as does a capitalised word starting a sentence
+    when a name follows it and it never appears in lowercase ("Budi Santoso
+    melaporkan"). Numbers become "0", except right after legal keywords such
+    as Pasal, ayat or UU, where they identify the offence.
+    """
+    lowercase_words = {_strip_punctuation(word) for word in text.split() if word.islower()}
+    tokens = text.split()
+    words = []
+    sentence_start = True
+    legal_window = 0
+    for position, word in enumerate(tokens):
+        bare = _strip_punctuation(word)
+        next_word = tokens[position + 1] if position + 1 < len(tokens) else ""
+        if bare.lower() in LEGAL_KEYWORDS:
+            words.append(word)
+            legal_window = LEGAL_WINDOW
+        elif legal_window > 0 and re.search(r"\d", word):
+            words.append(word)
+            legal_window -= 1
+        else:
+            legal_window = max(legal_window - 1, 0)
+            is_all_caps = len(bare) >= 2 and bare.isalpha() and bare.isupper()
+            if bare.upper() in KEEP_UPPERCASE:
+                # Abbreviations such as KUHP, CCTV or Rp
+                words.append(word)
+            elif is_all_caps and bare.lower() not in lowercase_words:
+                # All-caps names, e.g. "SITI AMINAH"; all-caps words also used in lowercase are kept
+                words.append("nama")
+            elif _is_capitalised(word) and (
+                not sentence_start
+                or (
+                    _is_capitalised(next_word)
+                    and _strip_punctuation(next_word).upper() not in KEEP_UPPERCASE
+                    and bare.lower() not in lowercase_words
+                    and bare.lower() not in ROLE_WORDS
+                )
+            ):
+                # Capitalised words inside a sentence are names of people, places or brands
+                words.append("nama")
+            else:
+                words.append(re.sub(r"\d+", "0", word))
+        sentence_start = word.endswith((".", "!", "?", ":")) and not _is_abbreviation(word)
+    text = " ".join(words).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    # Multi-word names and grouped amounts collapse to a single placeholder
+    return re.sub(r"\b(nama|0)(?: \1\b)+", r"\1", text)
+
+
+def legal_references(text: str) -> str:
+    """Articles and statutes cited in the text, normalised and joined, e.g. "pasal 362|pasal 363 ayat 1" """
+    references = {
+        re.sub(r"[^\w]+", " ", match.group(0).lower()).strip()
+        for match in LEGAL_REFERENCE_PATTERN.finditer(text)
+    }
+    return "|".join(sorted(references))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = normalize_case_text(text).split()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimated_similarity(signature: List[int], other: List[int]) -> float:
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERM
+
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        f"{band}:" + hashlib.blake2b(
+            struct.pack(f"{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS]), digest_size=8
+        ).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of analysed cases.
+
+    Cases are indexed by the same case hash the archive uses, so a match can be
+    used to look up the earlier classification and criminal analysis. The LSH
+    bands only select candidates; a candidate counts as a near-duplicate when
+    its estimated Jaccard similarity reaches the threshold and it cites
+    exactly the same articles and statutes. Cases that cite none never match:
+    with names and numbers masked, a theft and an embezzlement report can
+    share most of their wording, and the cited article is the only reliable
+    sign of the offence.
+    """
+
+    def __init__(self, db_file: str = NEAR_DUP_DB_FILE, threshold: float = NEAR_DUP_THRESHOLD):
+        self.db_file = db_file
+        self.threshold = threshold
+        self._local = threading.local()
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                case_hash TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                legal_refs TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band_key TEXT NOT NULL,
+                case_hash TEXT NOT NULL,
+                PRIMARY KEY (band_key, case_hash)
+            );
+            """
+        )
+        # Indexes created before legal references were stored lack the column
+        columns = {row[1] for row in self._connect().execute("PRAGMA table_info(signatures)")}
+        if "legal_refs" not in columns:
+            self._connect().execute("ALTER TABLE signatures ADD COLUMN legal_refs TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, case_info: str) -> None:
+        signature = minhash(case_info)
+        key = case_hash(case_info)
+        conn = self._connect()
+        conn.execute("BEGIN")
+        conn.execute(
+            "INSERT OR REPLACE INTO signatures (case_hash, signature, legal_refs, created_at) VALUES (?, ?, ?, ?)",
+            (key, struct.pack(f"{NUM_PERM}I", *signature), legal_references(case_info), time.time()),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO bands (band_key, case_hash) VALUES (?, ?)",
+            [(band_key, key) for band_key in _band_keys(signature)],
+        )
+        conn.execute("COMMIT")
+
+    def find(self, case_info: str) -> Optional[Tuple[str, float]]:
+        """Return (case_hash, similarity) of the most similar earlier case above the threshold"""
+        own_refs = legal_references(case_info)
+        if not own_refs:
+            return None
+        signature = minhash(case_info)
+        band_keys = _band_keys(signature)
+        own_hash = case_hash(case_info)
+        rows = self._connect().execute(
+            f"""
+            SELECT DISTINCT s.case_hash, s.signature, s.legal_refs FROM bands b
+            JOIN signatures s ON s.case_hash = b.case_hash
+            WHERE b.band_key IN ({",".join("?" * len(band_keys))})
+            """,
+            band_keys,
+        ).fetchall()
+
+        best = None
+        for candidate_hash, packed, candidate_refs in rows:
+            if candidate_hash == own_hash or candidate_refs != own_refs:
+                continue
+            similarity = estimated_similarity(signature, list(struct.unpack(f"{NUM_PERM}I", packed)))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate_hash, similarity)
+        return best
+
+
+_near_duplicate_index: Optional[NearDuplicateIndex] = None
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Return the process-wide index instance, opening it on first use"""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        _near_duplicate_index = NearDuplicateIndex()
+    return _near_duplicate_index
@@ -0,0 +1,31 @@
+import os
+import typer
+import uvicorn
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables before the workers import the app
+load_dotenv()
+
+# Create directory for the shared databases
+Path("tmp").mkdir(exist_ok=True)
+
+
+def serve(
+    app: str = typer.Option("playground:app", help="Import path of the ASGI app to serve"),
+    host: str = typer.Option("0.0.0.0", help="Interface to bind"),
+    port: int = typer.Option(7777, help="Port to bind"),
+    workers: int = typer.Option(os.cpu_count() or 1, help="Number of worker processes"),
+):
+    """Production entry point: multiple uvicorn workers, no reload.
+
+    Each worker imports the app once, so the agents it builds stay warm for
+    the lifetime of that worker. Responses, embeddings and search results are
+    kept in the SQLite cache from cache.py, which every worker shares.
+    """
+    print(f"Serving {app} on {host}:{port} with {workers} workers")
+    uvicorn.run(app, host=host, port=port, workers=workers, reload=False)
+
+
+if __name__ == "__main__":
+    typer.run(serve)
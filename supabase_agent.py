@@ -5,6 +5,8 @@ from rich.prompt import Prompt
 from supabase import create_client, Client
 from phi.agent import Agent
 from dotenv import load_dotenv
+from cache import get_shared_cache
+from decisions import overfetch_count, group_by_decision, needs_more_rows, MAX_MATCH_COUNT
 
 # Load environment variables from .env file
 load_dotenv()
@@ -31,29 +33,37 @@ class SupabaseSearch:
         self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
     def search(self, query: str, top_k: int = 2) -> list[dict]:
-        """Search documents using Supabase vector search"""
+        """Search documents using Supabase vector search, returning top_k distinct decisions"""
         try:
-            # Perform vector search
-            result = self.supabase.rpc('match_documents', {
-                'query_embedding': self.get_embedding(query),
-                'match_threshold': 0.6,
-                'match_count': top_k
-            }).execute()
+            # Over-fetch chunks since several rows can belong to the same decision
+            query_embedding = self.get_embedding(query)
+            match_count = overfetch_count(top_k)
+            match_threshold = 0.6
+            result = self.match_documents(query_embedding, match_count, match_threshold)
             
             if not result.data:
                 # Try with lower threshold if no results
-                result = self.supabase.rpc('match_documents', {
-                    'query_embedding': self.get_embedding(query),
-                    'match_threshold': 0.4,
-                    'match_count': top_k
-                }).execute()
+                match_threshold = 0.4
+                result = self.match_documents(query_embedding, match_count, match_threshold)
+
+            # Widen the fetch only when chunks of a few decisions filled every row
+            while needs_more_rows(result.data, match_count, top_k):
+                match_count = min(match_count * 2, MAX_MATCH_COUNT)
+                result = self.match_documents(query_embedding, match_count, match_threshold)
             
-            return self.process_results(result.data)
+            return self.process_results(group_by_decision(result.data, top_k))
         
         except Exception as e:
             print(f"Error searching documents: {e}")
             return []
 
+    def match_documents(self, query_embedding: list[float], match_count: int, match_threshold: float):
+        return self.supabase.rpc('match_documents', {
+            'query_embedding': query_embedding,
+            'match_threshold': match_threshold,
+            'match_count': match_count
+        }).execute()
+
     def get_embedding(self, query: str) -> list[float]:
         """Generate embedding using OpenAIEmbedder
         
@@ -76,8 +86,14 @@ class SupabaseSearch:
         from phi.embedder.openai import OpenAIEmbedder
         
         processed_query = query.strip().lower().replace('\s+', ' ').replace('[^\w\s]', '')
-        embedder = OpenAIEmbedder(model="text-embedding-3-small", dimensions=1536)
-        return embedder.get_embedding(processed_query)
+        shared_cache = get_shared_cache()
+        embedding_key = shared_cache.make_key(processed_query)
+        embedding = shared_cache.get("embedding", embedding_key)
+        if embedding is None:
+            embedder = OpenAIEmbedder(model="text-embedding-3-small", dimensions=1536)
+            embedding = embedder.get_embedding(processed_query)
+            shared_cache.set("embedding", embedding_key, embedding)
+        return embedding
 
     def process_results(self, documents: list[dict]) -> list[dict]:
         """Process and format search results"""
@@ -91,7 +107,8 @@ class SupabaseSearch:
                 'hukuman_penjara': metadata.get('hukuman_penjara'),
                 'hukuman_denda': metadata.get('hukuman_denda'),
                 'link_gdrive': metadata.get('link_gdrive'),
-                'similarity': round(doc['similarity'] * 100)
+                'similarity': round(doc['decision_score'] * 100),
+                'chunk_count': doc.get('chunk_count', 1)
             })
         return results
 
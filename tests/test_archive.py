@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import time
+
+from archive import ReportArchive, migrate_database
+
+
+def test_find_returns_latest_entry_for_case(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.db"))
+    archive.put("legal_reports", {"report": "first"}, "s1", "kasus  pencurian", created_at=1.0)
+    archive.put("legal_reports", {"report": "second"}, "s1", "kasus pencurian", created_at=2.0)
+
+    assert archive.find("legal_reports", "kasus pencurian") == {"report": "second"}
+    assert archive.find("case_classification", "kasus pencurian") is None
+
+
+def test_find_ignores_entries_older_than_max_age(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.db"))
+    archive.put("legal_search", {"results": "stale"}, "s1", "kasus", created_at=time.time() - 7200)
+
+    assert archive.find("legal_search", "kasus", max_age=3600) is None
+    assert archive.find("legal_search", "kasus") == {"results": "stale"}
+
+
+def _agent_db(path, updated_at=100):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS workflow_sessions "
+        "(session_id TEXT PRIMARY KEY, memory TEXT, session_data TEXT, created_at INTEGER, updated_at INTEGER)"
+    )
+    session_data = {"session_state": {"legal_reports": [{"case_info": "kasus pencurian", "report": "laporan"}]}}
+    conn.execute(
+        "INSERT OR REPLACE INTO workflow_sessions VALUES (?, ?, ?, ?, ?)",
+        ("s1", json.dumps({"runs": [{"input": "halo"}]}), json.dumps(session_data), 100, updated_at),
+    )
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_migrate_database_is_idempotent(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.db"))
+    db_file = _agent_db(tmp_path / "workflows.db")
+
+    assert migrate_database(archive, db_file) == {"workflow_sessions": (2, 0)}
+    assert migrate_database(archive, db_file) == {"workflow_sessions": (0, 1)}
+    assert archive.stats()["entries"] == 2
+
+    # An updated source row replaces its earlier entries instead of adding to them
+    _agent_db(tmp_path / "workflows.db", updated_at=200)
+    assert migrate_database(archive, db_file) == {"workflow_sessions": (2, 0)}
+    assert archive.stats()["entries"] == 2
+    assert archive.find("legal_reports", "kasus pencurian") == {"case_info": "kasus pencurian", "report": "laporan"}
+
+
+def test_remigration_only_replaces_entries_from_the_same_database(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.db"))
+    agents_db = _agent_db(tmp_path / "agents.db")
+    copy_db = _agent_db(tmp_path / "copy.db")
+    migrate_database(archive, agents_db)
+    migrate_database(archive, copy_db)
+
+    _agent_db(tmp_path / "copy.db", updated_at=200)
+    migrate_database(archive, copy_db)
+
+    assert archive.stats()["entries"] == 4
+
+
+def test_prune_keeps_agent_history(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.db"))
+    db_file = _agent_db(tmp_path / "workflows.db")
+    migrate_database(archive, db_file, prune=True)
+
+    conn = sqlite3.connect(db_file)
+    memory, session_data = conn.execute("SELECT memory, session_data FROM workflow_sessions").fetchone()
+    conn.close()
+    assert json.loads(memory) == {"runs": [{"input": "halo"}]}
+    assert json.loads(session_data) == {"session_state": {}}
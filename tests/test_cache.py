@@ -0,0 +1,35 @@
+import time
+
+from cache import SharedCache
+
+
+def test_entry_expires_after_namespace_ttl(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_TTL_LEGAL_SEARCH", "60")
+    cache = SharedCache(str(tmp_path / "cache.db"))
+    cache.set("legal_search", "key", "results")
+    assert cache.get("legal_search", "key") == "results"
+
+    # Age the entry past its TTL
+    cache._connect().execute("UPDATE cache SET created_at = ?", (time.time() - 120,))
+    assert cache.get("legal_search", "key") is None
+
+
+def test_set_purges_expired_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_TTL_LEGAL_SEARCH", "60")
+    cache = SharedCache(str(tmp_path / "cache.db"))
+    cache.set("legal_search", "old", "stale")
+    cache._connect().execute("UPDATE cache SET created_at = ?", (time.time() - 120,))
+
+    cache.set("legal_search", "new", "fresh")
+
+    keys = [row[0] for row in cache._connect().execute("SELECT key FROM cache")]
+    assert keys == ["new"]
+
+
+def test_zero_ttl_disables_expiry(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_TTL_LEGAL_REPORTS", "0")
+    cache = SharedCache(str(tmp_path / "cache.db"))
+    cache.set("legal_reports", "key", "report")
+    cache._connect().execute("UPDATE cache SET created_at = 0")
+
+    assert cache.get("legal_reports", "key") == "report"
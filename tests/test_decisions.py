@@ -0,0 +1,43 @@
+from decisions import MAX_MATCH_COUNT, decision_key, group_by_decision, needs_more_rows
+
+
+def _chunk(nomor, similarity, content="", **extra):
+    return {"metadata": {"nomor_putusan": nomor} if nomor else {}, "similarity": similarity, "content": content, **extra}
+
+
+def test_chunks_of_one_decision_collapse_to_one_result():
+    documents = [
+        _chunk("12/Pid.B/2023/PN Jkt", 0.71, "pertimbangan"),
+        _chunk("12/Pid.B/2023/PN Jkt", 0.83, "amar putusan"),
+        _chunk("40/Pid.B/2022/PN Bdg", 0.75),
+    ]
+    decisions = group_by_decision(documents, top_k=5)
+
+    assert [d["metadata"]["nomor_putusan"] for d in decisions] == ["12/Pid.B/2023/PN Jkt", "40/Pid.B/2022/PN Bdg"]
+    assert decisions[0]["chunk_count"] == 2
+    assert decisions[0]["decision_score"] == 0.83
+    assert decisions[0]["chunks"] == ["amar putusan", "pertimbangan"]
+
+
+def test_ranks_by_best_chunk_not_by_number_of_chunks():
+    documents = [_chunk("long", 0.62) for _ in range(5)] + [_chunk("strong", 0.9)]
+    decisions = group_by_decision(documents, top_k=1)
+
+    assert decisions[0]["metadata"]["nomor_putusan"] == "strong"
+
+
+def test_decision_key_falls_back_to_file_url():
+    assert decision_key(_chunk(None, 0.8, file_url="https://example.org/a.pdf", id=7)) == "https://example.org/a.pdf"
+    assert decision_key(_chunk(None, 0.8, id=7)) == "7"
+
+    documents = [_chunk(None, 0.8, file_url="a.pdf"), _chunk(None, 0.7, file_url="a.pdf")]
+    assert len(group_by_decision(documents, top_k=5)) == 1
+
+
+def test_needs_more_rows_only_when_fetch_was_full_and_below_cap():
+    full_of_one_decision = [_chunk("same", 0.8) for _ in range(20)]
+
+    assert needs_more_rows(full_of_one_decision, match_count=20, top_k=5)
+    assert not needs_more_rows(full_of_one_decision[:10], match_count=20, top_k=5)
+    assert not needs_more_rows([_chunk("same", 0.8)] * MAX_MATCH_COUNT, match_count=MAX_MATCH_COUNT, top_k=5)
+    assert not needs_more_rows([_chunk(str(i), 0.8) for i in range(20)], match_count=20, top_k=5)
@@ -0,0 +1,110 @@
+from dossier import merge_sections, split_dossier
+
+
+def test_merge_sections_keeps_numbered_witnesses():
+    partials = [
+        "## Witnesses\n1. Budi Santoso - saw the theft\n2. Siti Aminah - owner of the motorcycle\n"
+        "## Objects\n- Red motorcycle",
+        "## Witnesses\n1. Budi Santoso - saw the theft\n2. Joko Susilo - parking attendant\n"
+        "## Objects\n- Helmet",
+    ]
+    merged = merge_sections(partials)
+
+    assert "Siti Aminah" in merged
+    assert "Joko Susilo" in merged
+    assert merged.count("Budi Santoso") == 1
+    assert merged.index("## Witnesses") < merged.index("Joko Susilo") < merged.index("## Objects")
+
+
+def test_merge_sections_keeps_bold_items_and_labels():
+    merged = merge_sections([
+        "Saksi-saksi:\n**Andi Wijaya**\n- Rina",
+        "**Saksi-saksi:**\n**Andi Wijaya**\n- Dodi",
+    ])
+
+    assert merged.count("Andi Wijaya") == 1
+    assert "Rina" in merged and "Dodi" in merged
+    assert merged.count("Saksi-saksi:") == 1
+
+
+def test_merge_sections_dedups_formatting_variants_within_section():
+    merged = merge_sections([
+        "## Barang Bukti\n- Motor Honda",
+        "## Barang Bukti\n- **motor honda.**",
+    ])
+
+    assert merged == "## Barang Bukti\n- Motor Honda"
+
+
+def test_merge_sections_keeps_heading_when_items_repeat_elsewhere():
+    merged = merge_sections([
+        "## Witnesses\n- Budi",
+        "## Relevance\n- Budi",
+    ])
+
+    assert "## Witnesses\n- Budi" in merged
+    assert "## Relevance\n- Budi" in merged
+
+
+def test_merge_sections_keeps_continuation_lines_with_their_item():
+    merged = merge_sections([
+        "## Witnesses\n1. Budi\n   - Role: eyewitness\n2. Siti\n   - Role: eyewitness",
+    ])
+
+    assert merged.count("Role: eyewitness") == 2
+
+
+def test_merge_sections_dedups_nested_items_in_classification_output():
+    partials = [
+        "1. **Witnesses**:\n"
+        "   - Budi Santoso: saw the theft\n"
+        "   - Siti Aminah: owner of the motorcycle\n"
+        "2. **Objects**:\n"
+        "   - Red motorcycle\n"
+        "   - Helmet",
+        "1. **Witnesses**:\n"
+        "   - **Budi Santoso**: saw the theft\n"
+        "   - Joko Susilo: parking attendant\n"
+        "   - Siti Aminah: reported the loss to the police\n"
+        "2. **Objects**:\n"
+        "   - Red motorcycle\n"
+        "3. **Clues**:\n"
+        "   - CCTV footage from the parking lot",
+    ]
+    merged = merge_sections(partials)
+
+    assert merged.count("Budi Santoso") == 1
+    assert merged.count("Red motorcycle") == 1
+    assert "Siti Aminah: owner of the motorcycle; reported the loss to the police" in merged
+    assert merged.count("**Witnesses**") == 1
+    assert merged.index("**Witnesses**") < merged.index("Joko Susilo") < merged.index("**Objects**")
+    assert merged.index("Helmet") < merged.index("**Clues**") < merged.index("CCTV footage")
+
+
+def test_split_dossier_respects_chunk_size_and_keeps_text():
+    dossier = "\n".join([
+        "BERITA ACARA PEMERIKSAAN",
+        "Pemeriksaan saksi pertama. " * 100,
+        "",
+        "KETERANGAN SAKSI",
+        "Saksi melihat kejadian. " * 200,
+        "BARANG BUKTI",
+        "Satu unit sepeda motor.",
+    ])
+    chunks = split_dossier(dossier, chunk_chars=2000)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert "".join(dossier.split()) == "".join("".join(chunks).split())
+
+
+def test_split_dossier_starts_chunks_at_section_headers():
+    dossier = "BERITA ACARA\n" + "a " * 600 + "\nKETERANGAN SAKSI\n" + "b " * 600
+    chunks = split_dossier(dossier, chunk_chars=1500)
+
+    assert chunks[0].startswith("BERITA ACARA")
+    assert chunks[1].startswith("KETERANGAN SAKSI")
+
+
+def test_split_dossier_returns_short_text_as_single_chunk():
+    assert split_dossier("Ringkasan kasus singkat.") == ["Ringkasan kasus singkat."]
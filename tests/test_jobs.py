@@ -0,0 +1,72 @@
+import time
+
+from jobs import JobQueue
+
+
+def _expire_leases(queue):
+    queue._connect().execute("UPDATE jobs SET lease_expires_at = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def test_claims_higher_priority_first(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    low = queue.submit("case a", priority=0)
+    high = queue.submit("case b", priority=5)
+
+    assert queue.claim_next()["id"] == high
+    assert queue.claim_next()["id"] == low
+    assert queue.claim_next() is None
+
+
+def test_user_with_running_job_waits_behind_other_users(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    alice_first = queue.submit("case a1", user_id="alice")
+    alice_second = queue.submit("case a2", user_id="alice")
+    bob = queue.submit("case b1", user_id="bob")
+
+    assert queue.claim_next()["id"] == alice_first
+    assert queue.claim_next()["id"] == bob
+    assert queue.claim_next()["id"] == alice_second
+
+
+def test_expired_lease_requeues_then_fails(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    job_id = queue.submit("case")
+
+    assert queue.claim_next()["attempts"] == 1
+    _expire_leases(queue)
+    assert queue.claim_next()["attempts"] == 2
+    _expire_leases(queue)
+    assert queue.claim_next() is None
+
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert [event["stage"] for event in queue.get_events(job_id)] == ["queued", "requeued", "failed"]
+
+
+def test_stale_attempt_cannot_touch_reclaimed_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit("case")
+    stale = queue.claim_next()["attempts"]
+    _expire_leases(queue)
+    current = queue.claim_next()["attempts"]
+
+    assert not queue.heartbeat(job_id, stale)
+    assert not queue.add_event(job_id, "report", stale)
+    assert not queue.complete(job_id, stale, "stale report")
+    assert not queue.fail(job_id, stale, "stale error")
+    assert queue.get(job_id)["status"] == "running"
+
+    assert queue.complete(job_id, current, "report")
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == "report"
+
+
+def test_heartbeat_renews_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=60)
+    job_id = queue.submit("case")
+    attempt = queue.claim_next()["attempts"]
+    queue._connect().execute("UPDATE jobs SET lease_expires_at = ?", (time.time() + 1,))
+
+    assert queue.heartbeat(job_id, attempt)
+    assert queue.get(job_id)["lease_expires_at"] > time.time() + 30
@@ -0,0 +1,86 @@
+from near_duplicates import NearDuplicateIndex, legal_references, normalize_case_text
+
+TEMPLATE = (
+    "Pada tanggal {day} Januari 2024 sekitar pukul 21.00 WIB, saksi {witness} melaporkan bahwa "
+    "sepeda motor Honda Beat warna hitam miliknya yang diparkir di depan rumah di Jl. {street} "
+    "telah hilang dicuri oleh orang tidak dikenal. Tersangka {suspect} kemudian ditangkap oleh "
+    "petugas Polsek setempat bersama barang bukti kunci letter T dan sepeda motor tersebut. "
+    "Kerugian ditaksir sebesar Rp {loss} dan saksi {witness} mengenali tersangka dari rekaman "
+    "CCTV. Perbuatan tersangka diduga melanggar Pasal {article} KUHP."
+)
+
+
+def make_case(**overrides):
+    values = {
+        "day": 5, "witness": "Budi Santoso", "street": "Merdeka", "suspect": "ANDI WIJAYA",
+        "loss": "15.000.000", "article": "362",
+    }
+    values.update(overrides)
+    return TEMPLATE.format(**values)
+
+
+def test_normalize_masks_names_dates_and_amounts():
+    first = make_case()
+    second = make_case(day=17, witness="SITI AMINAH", street="Sudirman", suspect="Joko", loss="2.500.000")
+
+    assert normalize_case_text(first) == normalize_case_text(second)
+
+
+def test_normalize_keeps_article_numbers():
+    assert "pasal 362 kuhp" in normalize_case_text(make_case(article="362"))
+    assert normalize_case_text(make_case(article="362")) != normalize_case_text(make_case(article="378"))
+
+
+def test_normalize_masks_whole_name_at_sentence_start_and_keeps_rp():
+    first = normalize_case_text("Budi Santoso melaporkan kerugian Rp 5.000.000. Tersangka Andi ditangkap.")
+    second = normalize_case_text("Siti Aminah melaporkan kerugian Rp 750.000. Tersangka Joko Susilo ditangkap.")
+
+    assert first == second == "nama melaporkan kerugian rp 0 tersangka nama ditangkap"
+
+
+def test_legal_references():
+    text = "dijerat Pasal 363 ayat (1) KUHP jo pasal 362 serta UU No. 11 Tahun 2008"
+    assert legal_references(text) == "pasal 362|pasal 363 ayat 1|uu no 11 tahun 2008"
+
+
+def test_template_pair_matches(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    index.add(make_case())
+
+    match = index.find(make_case(day=17, witness="SITI AMINAH", suspect="Joko Susilo", loss="2.500.000"))
+
+    assert match is not None
+    assert match[1] >= index.threshold
+
+
+def test_pair_with_different_articles_does_not_match(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    index.add(make_case(article="362"))
+
+    assert index.find(make_case(witness="SITI AMINAH", article="378")) is None
+
+
+def test_unrelated_case_does_not_match(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    index.add(make_case())
+
+    assert index.find(
+        "Terjadi penipuan investasi online melalui aplikasi dengan kerugian ratusan juta rupiah "
+        "oleh tersangka yang mengaku sebagai agen resmi."
+    ) is None
+
+
+def test_uncited_cases_never_match(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    theft = (
+        "Pada tanggal 5 Januari 2024 sekitar pukul 21.00 WIB, saksi Budi Santoso melaporkan bahwa sepeda "
+        "motor Honda Beat warna hitam miliknya yang dititipkan kepada tersangka ANDI WIJAYA sejak bulan "
+        "Desember 2023 telah dicuri oleh tersangka dan dibawa pergi tanpa izin pemiliknya. Kerugian "
+        "ditaksir sebesar Rp 15.000.000 dan saksi telah melaporkan kejadian tersebut kepada petugas "
+        "Polsek setempat pada malam yang sama."
+    )
+    index.add(theft)
+
+    # Differs from the theft report in one verb, so only a cited article could tell them apart
+    assert index.find(theft.replace("dicuri", "digelapkan")) is None
+    assert index.find(theft.replace("Budi Santoso", "Siti Aminah")) is None